@@ -0,0 +1,30 @@
+"""
+Handlers de logging do projeto.
+
+O handler 'console' do LOGGING enfileira os registros e uma thread de fundo
+(QueueListener) faz a escrita no stream, tirando o I/O do caminho da requisição.
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+
+
+class QueueConsoleHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que escreve no console (stderr) através de um QueueListener.
+
+    A thread do listener é iniciada na criação do handler (pelo dictConfig,
+    em cada processo/worker) e encerrada no atexit, descarregando a fila.
+    """
+
+    def __init__(self):
+        log_queue = queue.SimpleQueue()
+        super().__init__(log_queue)
+        self._listener = logging.handlers.QueueListener(
+            log_queue,
+            logging.StreamHandler(),
+            respect_handler_level=True
+        )
+        self._listener.start()
+        atexit.register(self._listener.stop)
@@ -1,17 +1,55 @@
+from collections import namedtuple
 from pathlib import Path
 import os
+import sys
 
 # =========================================================
 # CARREGAMENTO DO .env
 # =========================================================
 
-try:
-    from dotenv import load_dotenv
-    load_dotenv(Path(__file__).resolve().parent.parent / '.env')
-except Exception:
-    # Se python-dotenv não estiver instalado,
-    # seguimos apenas com variáveis de ambiente do sistema
-    pass
+# O .env é lido uma única vez para um dicionário; variáveis já definidas no
+# ambiente (docker/env_file, shell) têm precedência sobre o arquivo.
+# Se DJANGO_SECRET_KEY já veio do ambiente (ex.: env_file do docker-compose),
+# as variáveis foram injetadas pelo orquestrador e o .env nem é lido.
+_DOTENV = {}
+if 'DJANGO_SECRET_KEY' not in os.environ:
+    try:
+        from dotenv import dotenv_values
+        _DOTENV = {
+            key: value
+            for key, value in dotenv_values(Path(__file__).resolve().parent.parent / '.env').items()
+            if value is not None
+        }
+    except Exception:
+        # Se python-dotenv não estiver instalado,
+        # seguimos apenas com variáveis de ambiente do sistema
+        pass
+
+_ENV = {**_DOTENV, **os.environ}
+
+# Valores aceitos como verdadeiro nas variáveis booleanas
+_TRUTHY = frozenset({'1', 'true', 'yes', 'on'})
+
+
+def env(key, default=None):
+    """Retorna o valor da variável de ambiente (ou do .env) ou o default."""
+    return _ENV.get(key, default)
+
+
+def env_bool(key, default=False):
+    """Retorna a variável como bool ('1', 'true', 'yes', 'on' são verdadeiros)."""
+    value = _ENV.get(key)
+    if value is None:
+        return default
+    return value.strip().lower() in _TRUTHY
+
+
+def env_list(key, default=None, separator=','):
+    """Retorna a variável como lista de strings não vazias separadas por vírgula."""
+    value = _ENV.get(key)
+    if value is None:
+        return list(default or [])
+    return [item.strip() for item in value.split(separator) if item.strip()]
 
 
 # =========================================================
@@ -25,17 +63,13 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SEGURANÇA BÁSICA
 # =========================================================
 
-SECRET_KEY = os.getenv('DJANGO_SECRET_KEY')
+SECRET_KEY = env('DJANGO_SECRET_KEY')
 if not SECRET_KEY:
     raise RuntimeError('DJANGO_SECRET_KEY não definido')
 
-DEBUG = os.getenv('DJANGO_DEBUG', 'False').lower() in ('1', 'true', 'yes')
+DEBUG = env_bool('DJANGO_DEBUG')
 
-ALLOWED_HOSTS = [
-    h.strip()
-    for h in os.getenv('DJANGO_ALLOWED_HOSTS', '').split(',')
-    if h.strip()
-]
+ALLOWED_HOSTS = env_list('DJANGO_ALLOWED_HOSTS')
 
 # Fallback seguro para desenvolvimento
 if not ALLOWED_HOSTS and DEBUG:
@@ -57,7 +91,6 @@ INSTALLED_APPS = [
     # Terceiros
     'rest_framework',
     'rest_framework.authtoken',
-    'corsheaders',
 
     # Apps locais
     'accounts',
@@ -67,7 +100,6 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
-    'corsheaders.middleware.CorsMiddleware',  # Deve estar antes de CommonMiddleware
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -75,6 +107,16 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Comandos de gerenciamento que não atendem HTTP não precisam do CORS.
+# (rest_framework.authtoken continua sempre: possui migrações/tabela própria)
+_NON_HTTP_COMMANDS = ('migrate', 'makemigrations', 'collectstatic')
+_SERVES_HTTP = not (len(sys.argv) > 1 and sys.argv[1] in _NON_HTTP_COMMANDS)
+
+if _SERVES_HTTP:
+    INSTALLED_APPS.insert(INSTALLED_APPS.index('rest_framework.authtoken') + 1, 'corsheaders')
+    # Deve estar antes de CommonMiddleware
+    MIDDLEWARE.insert(MIDDLEWARE.index('django.middleware.common.CommonMiddleware'), 'corsheaders.middleware.CorsMiddleware')
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -99,29 +141,40 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # BANCO DE DADOS
 # =========================================================
 
-POSTGRES_DB = os.getenv('POSTGRES_DB')
-POSTGRES_USER = os.getenv('POSTGRES_USER')
-POSTGRES_PASSWORD = os.getenv('POSTGRES_PASSWORD')
-POSTGRES_HOST = os.getenv('POSTGRES_HOST', 'db')
-POSTGRES_PORT = os.getenv('POSTGRES_PORT', '5432')
-
-if all([POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD]):
+_PostgresEnv = namedtuple('_PostgresEnv', 'NAME USER PASSWORD HOST PORT')
+_POSTGRES = _PostgresEnv(
+    env('POSTGRES_DB'),
+    env('POSTGRES_USER'),
+    env('POSTGRES_PASSWORD'),
+    env('POSTGRES_HOST', 'db'),
+    env('POSTGRES_PORT', '5432'),
+)
+
+# Postgres só é usado quando banco, usuário e senha estão definidos
+if all(_POSTGRES[:3]):
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.postgresql',
-            'NAME': POSTGRES_DB,
-            'USER': POSTGRES_USER,
-            'PASSWORD': POSTGRES_PASSWORD,
-            'HOST': POSTGRES_HOST,
-            'PORT': POSTGRES_PORT,
+            **_POSTGRES._asdict(),
         }
     }
 else:
-    db_name = os.getenv('DJANGO_DB_NAME', 'db.sqlite3')
+    db_name = env('DJANGO_DB_NAME', 'db.sqlite3')
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / db_name,
+            'OPTIONS': {
+                # Espera até 20s por locks em vez de falhar com "database is locked"
+                'timeout': 20,
+                # WAL: leituras (admin) não bloqueiam durante escritas (webhooks)
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA cache_size=-64000;'
+                    'PRAGMA temp_store=MEMORY;'
+                ),
+            },
         }
     }
 
@@ -152,7 +205,7 @@ USE_TZ = True
 # ARQUIVOS ESTÁTICOS
 # =========================================================
 
-STATIC_URL = os.getenv('DJANGO_STATIC_URL', 'static/')
+STATIC_URL = env('DJANGO_STATIC_URL', 'static/')
 
 
 # =========================================================
@@ -171,22 +224,22 @@ if not DEBUG:
 # =========================================================
 
 # GLPI API v2.1 (futuro)
-GLPI_API_URL = os.getenv('GLPI_API_URL')
-GLPI_API_TOKEN = os.getenv('GLPI_API_TOKEN')
-GLPI_BASE_URL = os.getenv('GLPI_BASE_URL')
+GLPI_API_URL = env('GLPI_API_URL')
+GLPI_API_TOKEN = env('GLPI_API_TOKEN')
+GLPI_BASE_URL = env('GLPI_BASE_URL')
 
 # GLPI API Legacy
-GLPI_LEGACY_API_URL = os.getenv('GLPI_LEGACY_API_URL')
-GLPI_LEGACY_API_USER = os.getenv('GLPI_LEGACY_API_USER')
-GLPI_LEGACY_API_PASSWORD = os.getenv('GLPI_LEGACY_API_PASSWORD')
-GLPI_LEGACY_APP_TOKEN = os.getenv('GLPI_LEGACY_APP_TOKEN')
+GLPI_LEGACY_API_URL = env('GLPI_LEGACY_API_URL')
+GLPI_LEGACY_API_USER = env('GLPI_LEGACY_API_USER')
+GLPI_LEGACY_API_PASSWORD = env('GLPI_LEGACY_API_PASSWORD')
+GLPI_LEGACY_APP_TOKEN = env('GLPI_LEGACY_APP_TOKEN')
 
 # n8n
-N8N_SURVEY_RESPONSE_WEBHOOK_URL = os.getenv('N8N_SURVEY_RESPONSE_WEBHOOK_URL')
-N8N_CATEGORY_APPROVAL_WEBHOOK_URL = os.getenv('N8N_CATEGORY_APPROVAL_WEBHOOK_URL')
+N8N_SURVEY_RESPONSE_WEBHOOK_URL = env('N8N_SURVEY_RESPONSE_WEBHOOK_URL')
+N8N_CATEGORY_APPROVAL_WEBHOOK_URL = env('N8N_CATEGORY_APPROVAL_WEBHOOK_URL')
 
 # IA - Google Gemini
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+GEMINI_API_KEY = env('GEMINI_API_KEY')
 
 
 # =========================================================
@@ -204,6 +257,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Limite por IP dos endpoints públicos da pesquisa de satisfação (ScopedRateThrottle)
+    'DEFAULT_THROTTLE_RATES': {
+        'satisfaction_survey': env('SATISFACTION_SURVEY_THROTTLE_RATE', '30/min'),
+    },
 }
 
 
@@ -215,8 +272,9 @@ LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
     'handlers': {
+        # StreamHandler atrás de uma fila: a requisição só faz Queue.put
         'console': {
-            'class': 'logging.StreamHandler',
+            '()': 'config.logconf.QueueConsoleHandler',
         },
     },
     'root': {
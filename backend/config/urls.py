@@ -7,7 +7,7 @@ Define as rotas principais incluindo:
 - Endpoints públicos de pesquisa de satisfação (fora de /api/)
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from core.views import SatisfactionSurveyRateView, SatisfactionSurveyCommentView
 
 urlpatterns = [
@@ -25,9 +25,9 @@ urlpatterns = [
     # =========================================================
     # 3. PESQUISA DE SATISFAÇÃO (Público, fora de /api/)
     # =========================================================
-    # Rating direto via botões no e-mail (1-5)
-    path(
-        'satisfaction-survey/<int:ticket_id>/rate/<int:rating>/',
+    # Rating direto via botões no e-mail (1-5); notas fora da faixa nem chegam à view
+    re_path(
+        r'^satisfaction-survey/(?P<ticket_id>\d+)/rate/(?P<rating>[1-5])/$',
         SatisfactionSurveyRateView.as_view(),
         name='satisfaction-survey-rate'
     ),
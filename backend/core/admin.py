@@ -1,8 +1,70 @@
+import html
+
 from django.contrib import admin
-from django.utils.html import mark_safe
+from django.contrib.admin.views.main import ChangeList
+from django.core.cache import cache
+from django.template.defaultfilters import linebreaksbr
+from django.db.models import Prefetch
+from django.utils.html import format_html, mark_safe
 from django.utils import timezone
 from .models import GlpiCategory, Ticket, CategorySuggestion, SatisfactionSurvey, KnowledgeBaseArticle
-from .services import get_category_path
+from .constants import LEVEL1_LOOKUPS_CACHE_KEY_PREFIX, LEVEL1_LOOKUPS_CACHE_TIMEOUT
+from .services import get_category_path, get_categories_cache_version
+from .utils import update_with_timestamp
+
+
+def _cleaned_text_to_html(text):
+    """
+    Formata para o admin um texto vindo de clean_html_content.
+    
+    strip_tags mantém entidades como &nbsp; e &amp;; elas são decodificadas
+    antes de linebreaksbr, que escapa o texto e converte as quebras de linha.
+    
+    Args:
+        text: Texto limpo (sem tags)
+        
+    Returns:
+        SafeString: Texto escapado com <br> nas quebras de linha
+    """
+    return linebreaksbr(html.unescape(text))
+
+
+def _cached_category_path(category):
+    """
+    Retorna o caminho da categoria, memorizado na própria instância.
+    
+    Evita recalcular get_category_path várias vezes para a mesma linha
+    (colunas level_1..level_6).
+    
+    Args:
+        category: Instância de GlpiCategory
+        
+    Returns:
+        List[str]: Caminho hierárquico da categoria
+    """
+    path = getattr(category, '_cached_path', None)
+    if path is None:
+        path = get_category_path(category)
+        category._cached_path = path
+    return path
+
+
+def _level_column(index):
+    """
+    Cria a coluna do admin que exibe um nível da hierarquia da categoria.
+    
+    Args:
+        index: Posição do nível no caminho (0 = nível 1)
+        
+    Returns:
+        function: Método de exibição (self, obj) -> nome do nível ou '-'
+    """
+    def level(self, obj):
+        path = _cached_category_path(obj)
+        return path[index] if len(path) > index else '-'
+    level.short_description = f'Nível {index + 1}'
+    return level
+
 
 class Level1Filter(admin.SimpleListFilter):
     """
@@ -14,16 +76,6 @@ class Level1Filter(admin.SimpleListFilter):
     title = 'Nível 1'
     parameter_name = 'level1'
     
-    def _get_effective_level1(self, category):
-        """
-        Retorna o nome do nível 1 lógico usado nos filtros.
-        Ignora prefixos como "TI" e usa o segundo nível quando disponível.
-        """
-        path = get_category_path(category)
-        if len(path) > 1:
-            return path[1]
-        return path[0] if path else None
-    
     def lookups(self, request, model_admin):
         """
         Retorna lista de categorias do nível 1 (raiz) para o filtro.
@@ -35,14 +87,29 @@ class Level1Filter(admin.SimpleListFilter):
         Returns:
             list: Lista de tuplas (id, nome) das categorias raiz
         """
-        level_names = []
-        seen = set()
-        for category in GlpiCategory.objects.all().order_by('name'):
-            name = self._get_effective_level1(category)
-            if name and name not in seen:
-                seen.add(name)
-                level_names.append((name, name))
-        return level_names
+        # Chave versionada pelo conteúdo da tabela: vale para todos os workers
+        return cache.get_or_set(
+            '%s:%s' % (LEVEL1_LOOKUPS_CACHE_KEY_PREFIX, get_categories_cache_version()),
+            self._load_level1_names,
+            LEVEL1_LOOKUPS_CACHE_TIMEOUT
+        )
+    
+    @staticmethod
+    def _load_level1_names():
+        """
+        Consulta os valores distintos de effective_level1 (chamada em cache miss).
+        
+        Returns:
+            list: Lista de tuplas (nome, nome) ordenada por nome
+        """
+        names = (
+            GlpiCategory.objects
+            .exclude(effective_level1='')
+            .order_by('effective_level1')
+            .values_list('effective_level1', flat=True)
+            .distinct()
+        )
+        return [(name, name) for name in names]
     
     def queryset(self, request, queryset):
         """
@@ -56,13 +123,22 @@ class Level1Filter(admin.SimpleListFilter):
             QuerySet: QuerySet filtrado contendo apenas categorias do nível 1 selecionado
         """
         if self.value():
-            category_ids = []
-            for cat in queryset:
-                if self._get_effective_level1(cat) == self.value():
-                    category_ids.append(cat.id)
-            return queryset.filter(id__in=category_ids)
+            return queryset.filter(effective_level1=self.value())
         return queryset
 
+
+class TicketChangeList(ChangeList):
+    """
+    Listagem de tickets sem as colunas pesadas.
+    
+    raw_payload e content_html só aparecem na página de detalhe; na listagem
+    ficam fora do SELECT (a busca em content_html continua no WHERE).
+    """
+    
+    def get_queryset(self, request, exclude_parameters=None):
+        return super().get_queryset(request, exclude_parameters).defer('raw_payload', 'content_html')
+
+
 @admin.register(Ticket)
 class TicketAdmin(admin.ModelAdmin):
     """
@@ -73,7 +149,8 @@ class TicketAdmin(admin.ModelAdmin):
     """
     list_display = ('id', 'name', 'category_name', 'category_suggestion_display', 'satisfaction_survey_display', 'classification_method', 'classification_confidence', 'created_at')
     list_filter = ('created_at', 'classification_method', 'classification_confidence')
-    search_fields = ('name', 'content_html', 'id')
+    # id é buscado por igualdade em get_search_results (ver migração 0023)
+    search_fields = ('name', 'content_html')
     
     readonly_fields = (
         'id',
@@ -113,12 +190,61 @@ class TicketAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_changelist(self, request, **kwargs):
+        """
+        Usa a listagem que não carrega raw_payload/content_html.
+        """
+        return TicketChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Acrescenta a busca exata pelo ID quando o termo é numérico.
+        
+        Um icontains em id viraria UPPER(id::text) LIKE, sem índice possível;
+        a igualdade usa a chave primária e os demais ramos usam os índices
+        trigram de name e content_html.
+        
+        Args:
+            request: Requisição HTTP
+            queryset: QuerySet da listagem
+            search_term: Termo digitado na busca
+            
+        Returns:
+            tuple: (queryset filtrado, may_have_duplicates)
+        """
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        term = search_term.strip()
+        if term.isdecimal() and term.isascii():
+            results |= queryset.filter(pk=int(term))
+        return results, may_have_duplicates
+
+    def get_queryset(self, request):
+        """
+        Carrega as sugestões pendentes e as pesquisas de satisfação de todos
+        os tickets da página (uma consulta para cada).
+        
+        Evita uma consulta por linha em category_suggestion_display e
+        satisfaction_survey_display.
+        """
+        return super().get_queryset(request).prefetch_related(
+            Prefetch(
+                'category_suggestions',
+                queryset=CategorySuggestion.objects.filter(status='pending').order_by('-created_at'),
+                to_attr='_pending_suggestions'
+            ),
+            Prefetch(
+                'satisfaction_surveys',
+                queryset=SatisfactionSurvey.objects.only('id', 'ticket').order_by('id'),
+                to_attr='_surveys'
+            )
+        )
+
     def content_text_clean(self, obj):
         """
         Exibe o conteúdo limpo do ticket formatado para HTML.
         
-        O conteúdo já vem limpo (sem HTML) do webhook, apenas formata
-        quebras de linha para exibição correta no admin.
+        O conteúdo já vem limpo (sem HTML) do webhook; é escapado e as
+        quebras de linha viram <br> para exibição correta no admin.
         
         Args:
             obj: Instância de Ticket
@@ -128,7 +254,7 @@ class TicketAdmin(admin.ModelAdmin):
         """
         if not obj.content_html:
             return "-"
-        return mark_safe(obj.content_html.replace('\n', '<br>'))
+        return _cleaned_text_to_html(obj.content_html)
 
     content_text_clean.short_description = 'Descrição'
     
@@ -145,15 +271,20 @@ class TicketAdmin(admin.ModelAdmin):
         if not obj.id:
             return "-"
         
-        suggestion = CategorySuggestion.objects.filter(
-            ticket=obj,
-            status='pending'
-        ).order_by('-created_at').first()
+        pending = getattr(obj, '_pending_suggestions', None)
+        if pending is not None:
+            suggestion = pending[0] if pending else None
+        else:
+            suggestion = CategorySuggestion.objects.filter(
+                ticket=obj,
+                status='pending'
+            ).order_by('-created_at').first()
         
         if suggestion:
-            url = f"/admin/core/categorysuggestion/{suggestion.id}/change/"
-            return mark_safe(
-                f'<a href="{url}" style="color: #417690; font-weight: bold;">{suggestion.suggested_path}</a>'
+            return format_html(
+                '<a href="/admin/core/categorysuggestion/{}/change/" style="color: #417690; font-weight: bold;">{}</a>',
+                suggestion.id,
+                suggestion.suggested_path
             )
         return "-"
     
@@ -172,12 +303,16 @@ class TicketAdmin(admin.ModelAdmin):
         if not obj.id:
             return "-"
         
-        survey = SatisfactionSurvey.objects.filter(ticket=obj).first()
+        surveys = getattr(obj, '_surveys', None)
+        if surveys is not None:
+            survey = surveys[0] if surveys else None
+        else:
+            survey = SatisfactionSurvey.objects.filter(ticket=obj).first()
         
         if survey:
-            url = f"/admin/core/satisfactionsurvey/{survey.id}/change/"
-            return mark_safe(
-                f'<a href="{url}" style="color: #417690; font-weight: bold;">Ver Pesquisa</a>'
+            return format_html(
+                '<a href="/admin/core/satisfactionsurvey/{}/change/" style="color: #417690; font-weight: bold;">Ver Pesquisa</a>',
+                survey.id
             )
         return "-"
     
@@ -194,9 +329,22 @@ class GlpiCategoryAdmin(admin.ModelAdmin):
     list_display = ('id_display', 'level_1', 'level_2', 'level_3', 'level_4', 'level_5', 'level_6')
     list_filter = (Level1Filter,)
     search_fields = ('name',)
+    readonly_fields = ('effective_level1',)
     ordering = ('glpi_id',)
     list_per_page = 100
     
+    def get_queryset(self, request):
+        """
+        Traz a cadeia de pais no mesmo SELECT.
+        
+        Categorias sem full_path têm o caminho montado subindo por parent;
+        o JOIN cobre os 6 níveis exibidos e evita uma consulta por nível
+        em cada linha da listagem.
+        """
+        return super().get_queryset(request).select_related(
+            'parent__parent__parent__parent__parent__parent'
+        )
+    
     def id_display(self, obj):
         """
         Exibe o ID GLPI da categoria.
@@ -211,89 +359,12 @@ class GlpiCategoryAdmin(admin.ModelAdmin):
     id_display.short_description = 'ID'
     id_display.admin_order_field = 'glpi_id'
     
-    def level_1(self, obj):
-        """
-        Retorna o nome da categoria do nível 1 (raiz) da hierarquia.
-        
-        Args:
-            obj: Instância de GlpiCategory
-            
-        Returns:
-            str: Nome da categoria raiz ou '-' se não houver
-        """
-        path = get_category_path(obj)
-        return path[0] if len(path) > 0 else '-'
-    level_1.short_description = 'Nível 1'
-    
-    def level_2(self, obj):
-        """
-        Retorna o nome da categoria do nível 2 da hierarquia.
-        
-        Args:
-            obj: Instância de GlpiCategory
-            
-        Returns:
-            str: Nome da categoria do nível 2 ou '-' se não houver
-        """
-        path = get_category_path(obj)
-        return path[1] if len(path) > 1 else '-'
-    level_2.short_description = 'Nível 2'
-    
-    def level_3(self, obj):
-        """
-        Retorna o nome da categoria do nível 3 da hierarquia.
-        
-        Args:
-            obj: Instância de GlpiCategory
-            
-        Returns:
-            str: Nome da categoria do nível 3 ou '-' se não houver
-        """
-        path = get_category_path(obj)
-        return path[2] if len(path) > 2 else '-'
-    level_3.short_description = 'Nível 3'
-    
-    def level_4(self, obj):
-        """
-        Retorna o nome da categoria do nível 4 da hierarquia.
-        
-        Args:
-            obj: Instância de GlpiCategory
-            
-        Returns:
-            str: Nome da categoria do nível 4 ou '-' se não houver
-        """
-        path = get_category_path(obj)
-        return path[3] if len(path) > 3 else '-'
-    level_4.short_description = 'Nível 4'
-    
-    def level_5(self, obj):
-        """
-        Retorna o nome da categoria do nível 5 da hierarquia.
-        
-        Args:
-            obj: Instância de GlpiCategory
-            
-        Returns:
-            str: Nome da categoria do nível 5 ou '-' se não houver
-        """
-        path = get_category_path(obj)
-        return path[4] if len(path) > 4 else '-'
-    level_5.short_description = 'Nível 5'
-
-    def level_6(self, obj):
-        """
-        Retorna o nome da categoria do nível 6 da hierarquia.
-        
-        Args:
-            obj: Instância de GlpiCategory
-            
-        Returns:
-            str: Nome da categoria do nível 6 ou '-' se não houver
-        """
-        path = get_category_path(obj)
-        return path[5] if len(path) > 5 else '-'
-    level_6.short_description = 'Nível 6'
+    level_1 = _level_column(0)
+    level_2 = _level_column(1)
+    level_3 = _level_column(2)
+    level_4 = _level_column(3)
+    level_5 = _level_column(4)
+    level_6 = _level_column(5)
 
 @admin.register(CategorySuggestion)
 class CategorySuggestionAdmin(admin.ModelAdmin):
@@ -355,8 +426,8 @@ class CategorySuggestionAdmin(admin.ModelAdmin):
         Returns:
             str: Link HTML para o ticket, 'Preview' se for preview, ou '-' se não houver
         """
-        if obj.ticket:
-            return mark_safe(f'<a href="/admin/core/ticket/{obj.ticket.id}/change/">Ticket #{obj.ticket.id}</a>')
+        if obj.ticket_id:
+            return format_html('<a href="/admin/core/ticket/{}/change/">Ticket #{}</a>', obj.ticket_id, obj.ticket_id)
         elif obj.source == 'preview':
             return 'Preview'
         return '-'
@@ -374,7 +445,7 @@ class CategorySuggestionAdmin(admin.ModelAdmin):
         """
         if not obj.ticket_content:
             return "-"
-        return mark_safe(obj.ticket_content.replace('\n', '<br>'))
+        return _cleaned_text_to_html(obj.ticket_content)
     ticket_content_display.short_description = 'Conteúdo do Ticket'
     
     def approve_suggestions(self, request, queryset):
@@ -385,13 +456,12 @@ class CategorySuggestionAdmin(admin.ModelAdmin):
             request: Requisição HTTP
             queryset: QuerySet de sugestões selecionadas
         """
-        count = 0
-        for suggestion in queryset.filter(status='pending'):
-            suggestion.status = 'approved'
-            suggestion.reviewed_at = timezone.now()
-            suggestion.reviewed_by = request.user.username
-            suggestion.save()
-            count += 1
+        count = update_with_timestamp(
+            queryset.filter(status='pending'),
+            status='approved',
+            reviewed_at=timezone.now(),
+            reviewed_by=request.user.username
+        )
         self.message_user(request, f'{count} sugestão(ões) aprovada(s).')
     approve_suggestions.short_description = 'Aprovar sugestões selecionadas'
     
@@ -403,13 +473,12 @@ class CategorySuggestionAdmin(admin.ModelAdmin):
             request: Requisição HTTP
             queryset: QuerySet de sugestões selecionadas
         """
-        count = 0
-        for suggestion in queryset.filter(status='pending'):
-            suggestion.status = 'rejected'
-            suggestion.reviewed_at = timezone.now()
-            suggestion.reviewed_by = request.user.username
-            suggestion.save()
-            count += 1
+        count = update_with_timestamp(
+            queryset.filter(status='pending'),
+            status='rejected',
+            reviewed_at=timezone.now(),
+            reviewed_by=request.user.username
+        )
         self.message_user(request, f'{count} sugestão(ões) rejeitada(s).')
     reject_suggestions.short_description = 'Rejeitar sugestões selecionadas'
     
@@ -424,13 +493,12 @@ class CategorySuggestionAdmin(admin.ModelAdmin):
             request: Requisição HTTP
             queryset: QuerySet de sugestões selecionadas
         """
-        count = 0
-        for suggestion in queryset.exclude(status='pending'):
-            suggestion.status = 'pending'
-            suggestion.reviewed_at = None
-            suggestion.reviewed_by = None
-            suggestion.save()
-            count += 1
+        count = update_with_timestamp(
+            queryset.exclude(status='pending'),
+            status='pending',
+            reviewed_at=None,
+            reviewed_by=None
+        )
         self.message_user(request, f'{count} sugestão(ões) revertida(s) para pendente.')
     reset_to_pending.short_description = 'Reverter para pendente'
 
@@ -476,7 +544,7 @@ class SatisfactionSurveyAdmin(admin.ModelAdmin):
         Returns:
             str: Link HTML para o ticket
         """
-        return mark_safe(f'<a href="/admin/core/ticket/{obj.ticket.id}/change/">{obj.ticket.id}</a>')
+        return format_html('<a href="/admin/core/ticket/{}/change/">{}</a>', obj.ticket_id, obj.ticket_id)
     ticket_link.short_description = 'Ticket'
     
     def rating_display(self, obj):
@@ -520,7 +588,7 @@ class SatisfactionSurveyAdmin(admin.ModelAdmin):
         """
         if not obj.comment:
             return "-"
-        return mark_safe(obj.comment.replace('\n', '<br>'))
+        return linebreaksbr(obj.comment)
     comment_display.short_description = 'Comentário Completo'
     
     def token_display(self, obj):
@@ -568,10 +636,8 @@ class SatisfactionSurveyAdmin(admin.ModelAdmin):
             request: Requisição HTTP
             queryset: QuerySet de pesquisas selecionadas
         """
-        count = 0
-        for survey in queryset:
-            survey.reset_token()
-            count += 1
+        # Mesmo efeito de SatisfactionSurvey.reset_token(), em um único UPDATE
+        count = queryset.update(token=None, token_expires_at=None)
         
         self.message_user(
             request,
@@ -630,15 +696,17 @@ class KnowledgeBaseArticleAdmin(admin.ModelAdmin):
             return obj.category[:50] + '...'
         return obj.category
     category_short.short_description = 'Categoria'
+    category_short.admin_order_field = 'category'
     
     def content_display(self, obj):
         """Exibe conteúdo Markdown formatado."""
         if not obj.content:
             return "-"
-        return mark_safe(
-            f'<pre style="white-space: pre-wrap; max-height: 400px; overflow-y: auto; '
-            f'padding: 1rem; border: 1px solid rgba(128, 128, 128, 0.3); '
-            f'border-radius: 4px; margin: 0; background: transparent;">{obj.content}</pre>'
+        return format_html(
+            '<pre style="white-space: pre-wrap; max-height: 400px; overflow-y: auto; '
+            'padding: 1rem; border: 1px solid rgba(128, 128, 128, 0.3); '
+            'border-radius: 4px; margin: 0; background: transparent;">{}</pre>',
+            obj.content
         )
     content_display.short_description = 'Conteúdo (Markdown)'
     
@@ -653,12 +721,11 @@ class KnowledgeBaseArticleAdmin(admin.ModelAdmin):
         """Exibe conteúdo HTML bruto (código-fonte) para copiar."""
         if not obj.content_html:
             return "-"
-        from django.utils.html import escape
-        escaped_html = escape(obj.content_html)
-        return mark_safe(
-            f'<pre style="white-space: pre-wrap; max-height: 400px; overflow-y: auto; '
-            f'padding: 1rem; border: 1px solid rgba(128, 128, 128, 0.3); '
-            f'border-radius: 4px; font-family: monospace; font-size: 0.9em; '
-            f'margin: 0; background: transparent;">{escaped_html}</pre>'
+        return format_html(
+            '<pre style="white-space: pre-wrap; max-height: 400px; overflow-y: auto; '
+            'padding: 1rem; border: 1px solid rgba(128, 128, 128, 0.3); '
+            'border-radius: 4px; font-family: monospace; font-size: 0.9em; '
+            'margin: 0; background: transparent;">{}</pre>',
+            obj.content_html
         )
     content_html_raw.short_description = 'HTML Bruto (Código-Fonte)'
@@ -5,5 +5,6 @@ Este módulo contém clientes para comunicação com serviços externos:
 - Gemini AI: Classificação e geração de conteúdo
 - GLPI Legacy API: Sincronização de categorias
 - n8n: Notificações via webhooks
+- http: Sessão HTTP compartilhada (pool de conexões)
 """
 
@@ -6,13 +6,42 @@ Centraliza toda comunicação com a API do Gemini, incluindo:
 - Chamadas à API
 - Tratamento de erros
 """
+import hashlib
 import logging
-from typing import Optional, Tuple
+import re
+import threading
+from typing import Dict, Optional, Tuple
 from django.conf import settings
+from django.core.cache import cache
 from ..exceptions import GeminiException
 
+try:
+    from google import genai
+except ImportError:
+    genai = None
+
 logger = logging.getLogger(__name__)
 
+_API_KEY_RE = re.compile(r'api[ _]key')
+_EXPIRED_MSG = 'A chave da API do Gemini está expirada. Por favor, renove a chave de API.'
+_INVALID_MSG = 'A chave da API do Gemini é inválida. Verifique a configuração da chave.'
+
+# Regras de classificação de erros, avaliadas em ordem (a primeira vence).
+# Cada regra casa quando todos os seus padrões aparecem na mensagem (minúscula).
+# Erros INVALID_ARGUMENT com "api key" caem nas regras de expirada/inválida.
+_ERROR_RULES = (
+    ((re.compile(r'503|unavailable|overloaded'),), 'service_unavailable',
+     'O modelo do Gemini está sobrecarregado. Tente novamente em alguns instantes.'),
+    ((re.compile(r'expired'), _API_KEY_RE), 'api_key_expired', _EXPIRED_MSG),
+    ((re.compile(r'invalid'), _API_KEY_RE), 'api_key_invalid', _INVALID_MSG),
+    ((re.compile(r'quota|rate limit'),), 'quota_exceeded',
+     'Limite de quota da API do Gemini foi excedido. Tente novamente mais tarde.'),
+    ((re.compile(r'authentication|unauthorized'),), 'api_key_invalid',
+     'Erro de autenticação com a API do Gemini. Verifique a chave de API.'),
+    ((re.compile(r'permission|forbidden'),), 'api_key_invalid',
+     'A chave da API do Gemini não tem permissões suficientes.'),
+)
+
 
 class GeminiClient:
     """
@@ -21,6 +50,14 @@ class GeminiClient:
     Encapsula toda lógica de autenticação, chamadas e tratamento de erros.
     """
     
+    # Clientes genai compartilhados no processo, por API key: instâncias de
+    # GeminiClient com a mesma chave reaproveitam o mesmo genai.Client.
+    _clients: Dict[str, object] = {}
+    _clients_lock = threading.Lock()
+    
+    # Validade das respostas guardadas por cache_response()
+    RESPONSE_CACHE_TIMEOUT = 3600
+    
     def __init__(self, api_key: Optional[str] = None):
         """
         Inicializa o cliente Gemini.
@@ -29,7 +66,6 @@ class GeminiClient:
             api_key: Chave da API do Gemini. Se None, tenta obter de settings.
         """
         self.api_key = api_key or getattr(settings, 'GEMINI_API_KEY', None)
-        self._client = None
     
     def get_client(self):
         """
@@ -41,23 +77,34 @@ class GeminiClient:
         if not self.api_key:
             return None
         
-        if self._client is None:
-            try:
-                from google import genai
-                self._client = genai.Client(api_key=self.api_key)
-            except ImportError:
-                logger.warning("Biblioteca google-genai não instalada")
-                return None
+        if genai is None:
+            logger.warning("Biblioteca google-genai não instalada")
+            return None
+        
+        client = self._clients.get(self.api_key)
+        if client is None:
+            with self._clients_lock:
+                client = self._clients.get(self.api_key)
+                if client is None:
+                    client = genai.Client(api_key=self.api_key)
+                    self._clients[self.api_key] = client
         
-        return self._client
+        return client
     
-    def generate_content(self, prompt: str, model: str = "gemini-2.5-flash") -> Optional[str]:
+    def generate_content(
+        self,
+        prompt: str,
+        model: str = "gemini-2.5-flash",
+        use_cache: bool = False
+    ) -> Optional[str]:
         """
         Faz chamada à API do Gemini e retorna a resposta processada.
         
         Args:
             prompt: Prompt a ser enviado
             model: Modelo a ser usado (padrão: gemini-2.5-flash)
+            use_cache: Se True, devolve a resposta guardada por cache_response()
+                       para o mesmo prompt, quando houver
             
         Returns:
             Optional[str]: Resposta processada ou None em caso de erro
@@ -66,6 +113,11 @@ class GeminiClient:
         if not client:
             return None
         
+        if use_cache:
+            cached = cache.get(self._response_cache_key(prompt, model))
+            if cached is not None:
+                return cached
+        
         try:
             response = client.models.generate_content(
                 model=model,
@@ -74,9 +126,37 @@ class GeminiClient:
             return response.text.strip() if response.text else None
         except Exception as e:
             error_type, error_message = self._parse_error(e)
-            logger.warning(f"Erro ao chamar API do Gemini: {error_type} - {str(e)}")
+            logger.warning("Erro ao chamar API do Gemini: %s - %s", error_type, e)
             raise GeminiException(error_type, error_message) from e
     
+    def cache_response(self, prompt: str, response_text: str, model: str = "gemini-2.5-flash") -> None:
+        """
+        Guarda uma resposta já validada pelo chamador para reuso com use_cache=True.
+        
+        Só deve ser chamado depois que a resposta foi interpretada com sucesso,
+        para que respostas inválidas não sejam repetidas nas novas tentativas.
+        
+        Args:
+            prompt: Prompt enviado
+            response_text: Resposta retornada por generate_content
+            model: Modelo usado na chamada
+        """
+        cache.set(self._response_cache_key(prompt, model), response_text, self.RESPONSE_CACHE_TIMEOUT)
+    
+    def _response_cache_key(self, prompt: str, model: str) -> str:
+        """
+        Monta a chave de cache da resposta (hash da API key, modelo e prompt).
+        
+        Args:
+            prompt: Prompt enviado
+            model: Modelo usado na chamada
+            
+        Returns:
+            str: Chave de cache
+        """
+        digest = hashlib.sha256(f'{self.api_key}\0{model}\0{prompt}'.encode()).hexdigest()
+        return f'gemini:response:{digest}'
+    
     def _parse_error(self, exception: Exception) -> Tuple[str, str]:
         """
         Analisa exceções da API do Gemini e retorna informações específicas sobre o erro.
@@ -92,31 +172,9 @@ class GeminiClient:
         error_str = str(exception)
         error_lower = error_str.lower()
         
-        if '503' in error_str or 'unavailable' in error_lower or 'overloaded' in error_lower:
-            return 'service_unavailable', 'O modelo do Gemini está sobrecarregado. Tente novamente em alguns instantes.'
-        
-        if 'api key expired' in error_lower or 'api_key_expired' in error_lower or 'expired' in error_lower:
-            if 'api key' in error_lower or 'api_key' in error_lower:
-                return 'api_key_expired', 'A chave da API do Gemini está expirada. Por favor, renove a chave de API.'
-        
-        if 'api key' in error_lower or 'api_key' in error_lower:
-            if 'invalid' in error_lower or 'api_key_invalid' in error_lower:
-                return 'api_key_invalid', 'A chave da API do Gemini é inválida. Verifique a configuração da chave.'
-        
-        if 'quota' in error_lower or 'rate limit' in error_lower:
-            return 'quota_exceeded', 'Limite de quota da API do Gemini foi excedido. Tente novamente mais tarde.'
-        
-        if 'authentication' in error_lower or 'unauthorized' in error_lower:
-            return 'api_key_invalid', 'Erro de autenticação com a API do Gemini. Verifique a chave de API.'
-        
-        if 'permission' in error_lower or 'forbidden' in error_lower:
-            return 'api_key_invalid', 'A chave da API do Gemini não tem permissões suficientes.'
-        
-        if 'invalid_argument' in error_lower or 'invalid argument' in error_lower:
-            if 'api key' in error_lower or 'api_key' in error_lower:
-                if 'expired' in error_lower:
-                    return 'api_key_expired', 'A chave da API do Gemini está expirada. Por favor, renove a chave de API.'
-                return 'api_key_invalid', 'A chave da API do Gemini é inválida. Verifique a configuração da chave.'
+        for patterns, error_type, message in _ERROR_RULES:
+            if all(pattern.search(error_lower) for pattern in patterns):
+                return error_type, message
         
         return 'unknown', f'Erro ao comunicar com a API do Gemini: {error_str}'
 
@@ -7,9 +7,11 @@ Centraliza toda comunicação com a API Legacy do GLPI, incluindo:
 - Tratamento de erros e timeouts
 """
 import logging
-from typing import List, Dict, Optional
-import requests
+import threading
+import time
+from typing import List, Dict, Optional, Tuple
 from django.conf import settings
+from .http import get_http_session
 
 logger = logging.getLogger(__name__)
 
@@ -19,8 +21,18 @@ class GlpiLegacyClient:
     Cliente para comunicação com GLPI Legacy API.
     
     Encapsula toda lógica de autenticação, chamadas e tratamento de erros.
+    
+    O session token é compartilhado entre instâncias do mesmo processo
+    (por URL/usuário) e reaproveitado até expirar ou a API responder 401.
     """
     
+    # Validade assumida do session token (o GLPI expira sessões ociosas)
+    SESSION_TOKEN_TTL = 10 * 60
+    
+    # (base_url, user) -> (session_token, instante de expiração em time.monotonic())
+    _session_token_cache: Dict[Tuple[str, str], Tuple[str, float]] = {}
+    _session_token_lock = threading.Lock()
+    
     def __init__(
         self,
         base_url: Optional[str] = None,
@@ -44,6 +56,7 @@ class GlpiLegacyClient:
         self.password = password or getattr(settings, 'GLPI_LEGACY_API_PASSWORD', None)
         self.app_token = app_token or getattr(settings, 'GLPI_LEGACY_APP_TOKEN', None)
         self._session_token = None
+        self._http = get_http_session()
     
     def _normalize_base_url(self, url: Optional[str]) -> Optional[str]:
         """
@@ -82,7 +95,7 @@ class GlpiLegacyClient:
         if self.app_token:
             headers['App-Token'] = self.app_token
         
-        response = requests.post(
+        response = self._http.post(
             f"{self.base_url}/initSession",
             json={
                 "login": self.user,
@@ -98,8 +111,37 @@ class GlpiLegacyClient:
             raise ValueError("Token de sessão não retornado pela API do GLPI")
         
         self._session_token = data['session_token']
+        with self._session_token_lock:
+            self._session_token_cache[(self.base_url, self.user)] = (
+                self._session_token,
+                time.monotonic() + self.SESSION_TOKEN_TTL
+            )
         return self._session_token
     
+    def _get_cached_session_token(self) -> str:
+        """
+        Retorna o session token em cache ou autentica novamente se expirado.
+        
+        Returns:
+            str: Session token válido
+        """
+        with self._session_token_lock:
+            cached = self._session_token_cache.get((self.base_url, self.user))
+        
+        if cached and time.monotonic() < cached[1]:
+            self._session_token = cached[0]
+            return self._session_token
+        
+        return self.get_session_token()
+    
+    def _invalidate_session_token(self) -> None:
+        """
+        Descarta o session token atual (ex.: após resposta 401 da API).
+        """
+        with self._session_token_lock:
+            self._session_token_cache.pop((self.base_url, self.user), None)
+        self._session_token = None
+    
     def fetch_categories(self) -> List[Dict]:
         """
         Busca todas as categorias ITIL da API Legacy do GLPI.
@@ -121,7 +163,7 @@ class GlpiLegacyClient:
             raise ValueError("GLPI_LEGACY_API_URL não configurado")
         
         if not self._session_token:
-            self.get_session_token()
+            self._get_cached_session_token()
         
         headers = {
             'Content-Type': 'application/json',
@@ -133,13 +175,21 @@ class GlpiLegacyClient:
         all_categories = []
         range_start = 0
         range_limit = 50
+        reauthenticated = False
         
         while True:
-            response = requests.get(
+            response = self._http.get(
                 f"{self.base_url}/ITILCategory/?expand_dropdowns=true&range={range_start}-{range_start + range_limit - 1}",
                 headers=headers,
                 timeout=30
             )
+            if response.status_code == 401 and not reauthenticated:
+                # Token expirou no GLPI antes do TTL local: autentica de novo e repete a página
+                logger.info("Session token do GLPI expirado, autenticando novamente")
+                self._invalidate_session_token()
+                headers['Session-Token'] = self.get_session_token()
+                reauthenticated = True
+                continue
             response.raise_for_status()
             
             categories_batch = response.json()
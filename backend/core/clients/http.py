@@ -0,0 +1,54 @@
+"""
+Sessão HTTP compartilhada pelos clients de integrações externas.
+
+Mantém um único requests.Session por processo, permitindo reaproveitar
+conexões TCP/TLS (keep-alive) entre chamadas ao GLPI e ao n8n em vez de
+abrir uma nova conexão a cada requisição.
+"""
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# Retry só se aplica a métodos idempotentes (padrão do urllib3): POSTs de
+# initSession e dos webhooks do n8n não são reenviados automaticamente.
+# Esgotadas as tentativas, a última resposta é devolvida e o raise_for_status()
+# dos clients continua sinalizando o erro como antes.
+# read=0: timeout de leitura não é repetido. Uma página lenta do GLPI (timeout
+# de 30s) repetida várias vezes passaria do --timeout do gunicorn e o worker
+# seria morto antes de a view devolver o 503; só erros de conexão e os status
+# abaixo são repetidos.
+_RETRY = Retry(
+    total=3,
+    read=0,
+    backoff_factor=0.3,
+    status_forcelist=(429, 502, 503, 504),
+    raise_on_status=False,
+)
+
+
+def _build_session() -> requests.Session:
+    """
+    Cria a sessão HTTP com pool de conexões e política de retry.
+
+    Returns:
+        requests.Session: Sessão configurada para http:// e https://
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=50, max_retries=_RETRY)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+_session = _build_session()
+
+
+def get_http_session() -> requests.Session:
+    """
+    Retorna a sessão HTTP compartilhada do processo.
+
+    Returns:
+        requests.Session: Sessão com pool de conexões reutilizáveis
+    """
+    return _session
@@ -10,6 +10,7 @@ import logging
 from typing import Optional, Dict, Any
 import requests
 from django.conf import settings
+from .http import get_http_session
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +42,7 @@ class N8nClient:
             category_approval_webhook_url or 
             getattr(settings, 'N8N_CATEGORY_APPROVAL_WEBHOOK_URL', None)
         )
+        self._http = get_http_session()
     
     def notify_survey_response(
         self,
@@ -71,7 +73,7 @@ class N8nClient:
                 'type': 'satisfaction-survey-update'
             }
             
-            response = requests.post(
+            response = self._http.post(
                 self.survey_webhook_url,
                 json=payload,
                 timeout=10
@@ -79,7 +81,7 @@ class N8nClient:
             response.raise_for_status()
             return True
         except requests.RequestException as e:
-            logger.error(f"Erro ao notificar n8n sobre pesquisa de satisfação: {str(e)}")
+            logger.error("Erro ao notificar n8n sobre pesquisa de satisfação: %s", e)
             return False
     
     def notify_category_approval(
@@ -141,7 +143,7 @@ class N8nClient:
                 'is_change': is_change
             }
             
-            response = requests.post(
+            response = self._http.post(
                 self.category_approval_webhook_url,
                 json=payload,
                 timeout=10
@@ -149,6 +151,6 @@ class N8nClient:
             response.raise_for_status()
             return True
         except requests.RequestException as e:
-            logger.error(f"Erro ao notificar n8n sobre aprovação de categoria: {str(e)}")
+            logger.error("Erro ao notificar n8n sobre aprovação de categoria: %s", e)
             return False
 
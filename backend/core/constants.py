@@ -47,3 +47,8 @@ KNOWLEDGE_BASE_ARTICLE_SOURCE_CHOICES = [
     ('preview', 'Preview Manual'),
 ]
 
+
+# Cache das opções do filtro "Nível 1" do admin de categorias
+# (a chave final inclui a versão da tabela, ver get_categories_cache_version)
+LEVEL1_LOOKUPS_CACHE_KEY_PREFIX = 'glpicategory:level1_lookups'
+LEVEL1_LOOKUPS_CACHE_TIMEOUT = 10 * 60
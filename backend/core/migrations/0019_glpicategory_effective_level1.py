@@ -0,0 +1,36 @@
+from django.db import migrations, models
+
+
+def populate_effective_level1(apps, schema_editor):
+    GlpiCategory = apps.get_model('core', 'GlpiCategory')
+
+    for category in GlpiCategory.objects.all():
+        if category.full_path:
+            path = [part.strip() for part in category.full_path.split('>') if part.strip()]
+        else:
+            path = []
+            current = category
+            while current:
+                path.insert(0, current.name)
+                current = current.parent
+        if len(path) > 1:
+            category.effective_level1 = path[1]
+        else:
+            category.effective_level1 = path[0] if path else ''
+        category.save(update_fields=['effective_level1'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_knowledgebasearticle_categorysuggestion_source_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='glpicategory',
+            name='effective_level1',
+            field=models.CharField(blank=True, db_index=True, default='', help_text='Nível 1 lógico usado no filtro do admin (segundo nível do caminho, ou o primeiro se for raiz)', max_length=255),
+        ),
+        migrations.RunPython(populate_effective_level1, migrations.RunPython.noop),
+    ]
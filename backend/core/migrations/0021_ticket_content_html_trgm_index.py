@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+# A busca do admin (search_fields com content_html) gera, no PostgreSQL,
+# UPPER("core_ticket"."content_html"::text) LIKE UPPER('%termo%'). Como a coluna
+# já é text, o cast não altera a expressão e o índice GIN trigram abaixo casa
+# com ela. A busca só evita a varredura quando todos os ramos do OR têm índice:
+# name ganha o seu na migração 0023 e id é buscado por igualdade.
+CREATE_TRGM_INDEX = (
+    'CREATE INDEX IF NOT EXISTS ticket_content_html_trgm_idx '
+    'ON core_ticket USING gin (UPPER(content_html) gin_trgm_ops)'
+)
+DROP_TRGM_INDEX = 'DROP INDEX IF EXISTS ticket_content_html_trgm_idx'
+
+
+def create_trgm_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(CREATE_TRGM_INDEX)
+
+
+def drop_trgm_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(DROP_TRGM_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_ticket_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trgm_index, drop_trgm_index),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_ticket_content_html_trgm_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='categorysuggestion',
+            index=models.Index(fields=['ticket', 'status', '-created_at'], name='catsugg_ticket_status_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+# A busca do admin combina name e content_html com OR:
+# UPPER("core_ticket"."name"::text) LIKE ... OR UPPER("core_ticket"."content_html"::text) LIKE ...
+# O PostgreSQL só monta um BitmapOr se cada ramo tiver índice; este cobre name
+# (varchar, daí o cast para text na mesma forma que o Django emite).
+CREATE_TRGM_INDEX = (
+    'CREATE INDEX IF NOT EXISTS ticket_name_trgm_idx '
+    'ON core_ticket USING gin (UPPER(name::text) gin_trgm_ops)'
+)
+DROP_TRGM_INDEX = 'DROP INDEX IF EXISTS ticket_name_trgm_idx'
+
+
+def create_trgm_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(CREATE_TRGM_INDEX)
+
+
+def drop_trgm_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(DROP_TRGM_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_categorysuggestion_ticket_status_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trgm_index, drop_trgm_index),
+    ]
@@ -31,6 +31,13 @@ class GlpiCategory(models.Model):
         default='',
         help_text="Caminho completo (ex.: 'TI > Requisição > Acesso')"
     )
+    effective_level1 = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+        db_index=True,
+        help_text="Nível 1 lógico usado no filtro do admin (segundo nível do caminho, ou o primeiro se for raiz)"
+    )
     parent = models.ForeignKey(
         'self',
         null=True,
@@ -50,6 +57,23 @@ class GlpiCategory(models.Model):
     def __str__(self):
         return f"{self.name} ({self.glpi_id})"
 
+    def save(self, *args, **kwargs):
+        """
+        Recalcula effective_level1 a partir do caminho antes de gravar.
+        
+        Mantém o filtro de nível 1 do admin coerente em qualquer escrita
+        (sincronização, edição no admin, shell), inclusive quando save()
+        recebe update_fields, como em update_or_create.
+        """
+        # Import local: services importa este módulo
+        from .services import get_category_path, get_effective_level1
+        self.effective_level1 = get_effective_level1(get_category_path(self))
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            # updated_at entra sempre: ele versiona os caches de categorias
+            kwargs['update_fields'] = {*update_fields, 'effective_level1', 'updated_at'}
+        super().save(*args, **kwargs)
+
 
 class Ticket(models.Model):
     """
@@ -124,6 +148,11 @@ class Ticket(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Ticket GLPI'
         verbose_name_plural = 'Tickets GLPI'
+        indexes = [
+            # Ordenação padrão e filtro por data do admin
+            models.Index(fields=['-created_at'], name='ticket_created_at_idx'),
+            models.Index(fields=['category_name'], name='ticket_category_name_idx'),
+        ]
 
     def __str__(self):
         return f"Ticket GLPI #{self.id}"
@@ -206,6 +235,10 @@ class CategorySuggestion(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Sugestão de Categoria'
         verbose_name_plural = 'Sugestões de Categorias'
+        indexes = [
+            # Sugestão pendente mais recente por ticket (admin e revisão)
+            models.Index(fields=['ticket', 'status', '-created_at'], name='catsugg_ticket_status_idx'),
+        ]
 
     def __str__(self):
         if self.ticket:
@@ -289,7 +322,8 @@ class SatisfactionSurvey(models.Model):
         if not self.token or not provided_token:
             return False
         
-        if self.token != provided_token:
+        # Comparação em tempo constante para não vazar prefixos válidos por timing
+        if not secrets.compare_digest(self.token.encode(), provided_token.encode()):
             return False
         
         # Verifica expiração
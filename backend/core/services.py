@@ -5,22 +5,32 @@ Este módulo contém funções para classificação automática de tickets usand
 Google Gemini AI. 
 """
 import logging
+import re
 from typing import Optional, Dict, Tuple, List, Any
+from django.core.cache import cache
+from django.db.models import Count, Max
 from django.utils import timezone
 from .models import GlpiCategory, CategorySuggestion, Ticket, SatisfactionSurvey, KnowledgeBaseArticle
 from .prompts import get_classification_prompt, get_suggestion_prompt, get_knowledge_base_prompt
 from .constants import SYSTEMS, EVENT_KEYWORDS, GENERIC_CATEGORIES, VALID_ARTICLE_TYPES
 from .clients.gemini_client import GeminiClient
+from .clients.n8n_client import N8nClient
 from .exceptions import GeminiException
 from .parsers.gemini_response_parser import (
     parse_classification_response,
     parse_suggestion_response,
     parse_knowledge_base_response
 )
-from .utils import markdown_to_html
+from .utils import clean_html_content, markdown_to_html, update_with_timestamp
 
 logger = logging.getLogger(__name__)
 
+# Formato dos tokens gerados por SatisfactionSurvey.generate_token (secrets.token_urlsafe(32))
+_SURVEY_TOKEN_RE = re.compile(r'^[A-Za-z0-9_-]{43}$')
+
+# Tempo (segundos) que a lista de categorias para prompts fica em cache
+CATEGORIES_FOR_AI_CACHE_TIMEOUT = 60 * 60
+
 
 def get_category_path(category) -> List[str]:
     """
@@ -44,6 +54,23 @@ def get_category_path(category) -> List[str]:
     return path
 
 
+def get_effective_level1(path: List[str]) -> str:
+    """
+    Retorna o nome do nível 1 lógico de uma categoria.
+    
+    Ignora prefixos como "TI" e usa o segundo nível quando disponível.
+    
+    Args:
+        path: Caminho da categoria (lista de strings)
+        
+    Returns:
+        str: Nome do nível 1 lógico ou '' se o caminho estiver vazio
+    """
+    if len(path) > 1:
+        return path[1]
+    return path[0] if path else ''
+
+
 def find_category_by_path(path: str) -> Optional[GlpiCategory]:
     """
     Busca uma categoria existente no banco percorrendo o caminho informado.
@@ -58,6 +85,15 @@ def find_category_by_path(path: str) -> Optional[GlpiCategory]:
         return None
     
     parts = [p.strip() for p in path.split('>') if p.strip()]
+    if not parts:
+        return None
+    
+    # Caminho já normalizado como gravado na sincronização: uma única consulta
+    category = GlpiCategory.objects.filter(full_path=' > '.join(parts)).first()
+    if category:
+        return category
+    
+    # Fallback para categorias sem full_path preenchido: percorre nível a nível
     parent = None
     for part in parts:
         parent = GlpiCategory.objects.filter(name=part, parent=parent).first()
@@ -102,7 +138,7 @@ def process_categories_sync(categories, source_name="fonte"):
             if not parent:
                 parent_segments = [p.strip() for p in parent_path.split('>') if p.strip()]
                 if len(parent_segments) > 1:
-                    logger.warning(f"Categoria pai '{parent_path}' não encontrada na {source_name}. Criando sem pai.")
+                    logger.warning("Categoria pai '%s' não encontrada na %s. Criando sem pai.", parent_path, source_name)
         
         obj, created = GlpiCategory.objects.update_or_create(
             glpi_id=entry["glpi_id"],
@@ -159,6 +195,22 @@ def determine_ticket_type(path_parts: List[str]) -> Tuple[Optional[int], Optiona
     return None, None
 
 
+def get_categories_cache_version() -> str:
+    """
+    Retorna um identificador da versão atual da tabela de categorias.
+    
+    Usado na chave de caches derivados das categorias: qualquer criação,
+    alteração (updated_at) ou remoção muda a versão, então a chave muda em
+    todos os workers sem depender de invalidação no cache local de cada um.
+    
+    Returns:
+        str: "<quantidade>:<timestamp do último updated_at>"
+    """
+    fingerprint = GlpiCategory.objects.aggregate(total=Count('id'), last_update=Max('updated_at'))
+    last_update = fingerprint['last_update']
+    return '%s:%s' % (fingerprint['total'], last_update.timestamp() if last_update else 0)
+
+
 def get_categories_for_ai() -> str:
     """
     Retorna lista formatada de categorias para uso em prompts de IA.
@@ -167,7 +219,17 @@ def get_categories_for_ai() -> str:
         str: String formatada com todas as categorias hierárquicas, uma por linha,
              no formato "- Categoria > Subcategoria (ID: 123)"
     """
-    categories = GlpiCategory.objects.all()
+    cache_key = 'categories_for_ai:%s' % get_categories_cache_version()
+    
+    categories_text = cache.get(cache_key)
+    if categories_text is not None:
+        return categories_text
+    
+    # Só as colunas usadas no texto, lidas em blocos em vez de materializar
+    # a tabela inteira no cache do queryset.
+    categories = GlpiCategory.objects.only(
+        'glpi_id', 'name', 'full_path', 'parent'
+    ).iterator(chunk_size=500)
     category_list = []
     
     for category in categories:
@@ -175,7 +237,9 @@ def get_categories_for_ai() -> str:
         full_path = ' > '.join(path)
         category_list.append(f"- {full_path} (ID: {category.glpi_id})")
     
-    return '\n'.join(category_list)
+    categories_text = '\n'.join(category_list)
+    cache.set(cache_key, categories_text, CATEGORIES_FOR_AI_CACHE_TIMEOUT)
+    return categories_text
 
 
 def _is_generic_category(category_path: List[str]) -> bool:
@@ -239,7 +303,7 @@ def _find_similar_category(
                         if not any(filter_term in full_path_lower for filter_term in path_filters):
                             continue
                     
-                    logger.info(f"Categoria similar encontrada: {full_path}")
+                    logger.info("Categoria similar encontrada: %s", full_path)
                     return full_path
     return None
 
@@ -337,7 +401,7 @@ def classify_ticket_with_gemini(
     try:
         categories_text = get_categories_for_ai()
         prompt = get_classification_prompt(categories_text, title, content)
-        response_text = client.generate_content(prompt)
+        response_text = client.generate_content(prompt, use_cache=True)
         
         if not response_text or "Nenhuma" in response_text.lower():
             return None
@@ -371,7 +435,11 @@ def classify_ticket_with_gemini(
         category_path = get_category_path(category)
         
         if _is_generic_category(category_path):
-            logger.info(f"Categoria muito genérica encontrada ({len(category_path)} níveis): {' > '.join(category_path)}. Gerando sugestão mais específica.")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "Categoria muito genérica encontrada (%d níveis): %s. Gerando sugestão mais específica.",
+                    len(category_path), ' > '.join(category_path)
+                )
             return None
         
         ticket_text = f"{title} {content}".lower()
@@ -380,11 +448,14 @@ def classify_ticket_with_gemini(
         if len(category_path) == 4 and mentions_system:
             last_level = category_path[-1].lower()
             if last_level in ['problema de acesso', 'problemas de acesso', 'indisponibilidade de sistema']:
-                logger.info(f"Categoria '{last_level}' encontrada mas ticket menciona sistema específico. Gerando sugestão mais específica com sistema.")
+                logger.info("Categoria '%s' encontrada mas ticket menciona sistema específico. Gerando sugestão mais específica com sistema.", last_level)
                 return None
         
         ticket_type, ticket_type_label = determine_ticket_type(category_path)
         
+        # Só a resposta que resultou em classificação válida é reaproveitada
+        client.cache_response(prompt, response_text)
+        
         return {
             'suggested_category_name': ' > '.join(category_path),
             'suggested_category_id': category.glpi_id,
@@ -395,10 +466,10 @@ def classify_ticket_with_gemini(
         }
         
     except GeminiException as e:
-        logger.warning(f"Erro ao classificar com Gemini AI: {e.error_type} - {e.message}")
+        logger.warning("Erro ao classificar com Gemini AI: %s - %s", e.error_type, e.message)
         return {'error': e.error_type, 'message': e.message}
     except Exception as e:
-        logger.warning(f"Erro inesperado ao classificar com Gemini AI: {str(e)}")
+        logger.warning("Erro inesperado ao classificar com Gemini AI: %s", e)
         return {'error': 'unknown', 'message': f'Erro ao comunicar com a API do Gemini: {str(e)}'}
 
 
@@ -451,10 +522,10 @@ def generate_category_suggestion(
         return suggested_path
         
     except GeminiException as e:
-        logger.warning(f"Erro ao gerar sugestão de categoria: {e.error_type} - {e.message}")
+        logger.warning("Erro ao gerar sugestão de categoria: %s - %s", e.error_type, e.message)
         return None
     except Exception as e:
-        logger.warning(f"Erro inesperado ao gerar sugestão de categoria: {str(e)}")
+        logger.warning("Erro inesperado ao gerar sugestão de categoria: %s", e)
         return None
 
 
@@ -503,10 +574,10 @@ def save_category_suggestion(
         return suggestion
         
     except Ticket.DoesNotExist:
-        logger.warning(f"Ticket {ticket_id} não encontrado para salvar sugestão")
+        logger.warning("Ticket %s não encontrado para salvar sugestão", ticket_id)
         return None
     except Exception as e:
-        logger.error(f"Erro ao salvar sugestão de categoria: {str(e)}")
+        logger.error("Erro ao salvar sugestão de categoria: %s", e)
         return None
 
 
@@ -535,10 +606,10 @@ def save_preview_suggestion(
             status='pending',
             source='preview'
         )
-        logger.info(f"Sugestão de preview salva: {suggested_path}")
+        logger.info("Sugestão de preview salva: %s", suggested_path)
         return suggestion
     except Exception as e:
-        logger.error(f"Erro ao salvar sugestão de preview: {str(e)}")
+        logger.error("Erro ao salvar sugestão de preview: %s", e)
         return None
 
 
@@ -574,7 +645,7 @@ def classify_ticket(
         
         if suggested_path and isinstance(suggested_path, str):
             save_category_suggestion(ticket_id, suggested_path, title, content)
-            logger.info(f"Sugestão de categoria criada para ticket {ticket_id}: {suggested_path}")
+            logger.info("Sugestão de categoria criada para ticket %s: %s", ticket_id, suggested_path)
     
     return result
 
@@ -655,7 +726,7 @@ def generate_knowledge_base_article(
         artigos (um para cada sistema/software identificado no contexto).
     """
     if article_type.lower() not in VALID_ARTICLE_TYPES:
-        logger.warning(f"Tipo de artigo inválido: {article_type}. Tipos válidos: {VALID_ARTICLE_TYPES}")
+        logger.warning("Tipo de artigo inválido: %s. Tipos válidos: %s", article_type, VALID_ARTICLE_TYPES)
         return {'error': 'invalid_article_type', 'message': f'Tipo de artigo inválido. Tipos válidos: {", ".join(VALID_ARTICLE_TYPES)}'}
     
     if not category or not category.strip():
@@ -689,7 +760,10 @@ def generate_knowledge_base_article(
         for article in articles:
             article['content_html'] = markdown_to_html(article['content'])
         
-        logger.info(f"Artigo(s) de Base de Conhecimento gerado(s) com sucesso. Tipo: {article_type}, Categoria: {category}, Total: {len(articles)}")
+        logger.info(
+            "Artigo(s) de Base de Conhecimento gerado(s) com sucesso. Tipo: %s, Categoria: %s, Total: %d",
+            article_type, category, len(articles)
+        )
         
         return {
             'articles': articles,
@@ -698,10 +772,10 @@ def generate_knowledge_base_article(
         }
         
     except GeminiException as e:
-        logger.warning(f"Erro ao gerar artigo de Base de Conhecimento: {e.error_type} - {e.message}")
+        logger.warning("Erro ao gerar artigo de Base de Conhecimento: %s - %s", e.error_type, e.message)
         return {'error': e.error_type, 'message': e.message}
     except Exception as e:
-        logger.warning(f"Erro inesperado ao gerar artigo de Base de Conhecimento: {str(e)}")
+        logger.warning("Erro inesperado ao gerar artigo de Base de Conhecimento: %s", e)
         return {'error': 'unknown', 'message': f'Erro ao comunicar com a API do Gemini: {str(e)}'}
 
 
@@ -726,8 +800,9 @@ def save_knowledge_base_articles(
     saved_articles = []
     
     try:
-        for article in articles:
-            kb_article = KnowledgeBaseArticle.objects.create(
+        # Um único INSERT com múltiplas linhas; os IDs são preenchidos pelo banco
+        saved_articles = KnowledgeBaseArticle.objects.bulk_create([
+            KnowledgeBaseArticle(
                 article_type=article_type.lower(),
                 category=category.strip(),
                 context=context.strip(),
@@ -735,13 +810,17 @@ def save_knowledge_base_articles(
                 content_html=article.get('content_html', ''),
                 source='preview'
             )
-            saved_articles.append(kb_article)
+            for article in articles
+        ])
         
-        logger.info(f"{len(saved_articles)} artigo(s) de Base de Conhecimento salvo(s) no banco. Tipo: {article_type}, Categoria: {category}")
+        logger.info(
+            "%d artigo(s) de Base de Conhecimento salvo(s) no banco. Tipo: %s, Categoria: %s",
+            len(saved_articles), article_type, category
+        )
         return saved_articles
         
     except Exception as e:
-        logger.error(f"Erro ao salvar artigos de Base de Conhecimento: {str(e)}")
+        logger.error("Erro ao salvar artigos de Base de Conhecimento: %s", e)
         return saved_articles
 
 
@@ -764,24 +843,27 @@ def update_ticket_with_classification(
         bool: True se atualizado com sucesso, False caso contrário
     """
     try:
-        ticket = Ticket.objects.get(id=ticket_id)
-        suggested_category = GlpiCategory.objects.filter(
+        suggested_category_id = GlpiCategory.objects.filter(
             glpi_id=classification_result.get("suggested_category_id")
-        ).first()
-        
-        if suggested_category:
-            ticket.category = suggested_category
-            ticket.category_name = classification_result.get("suggested_category_name")
-            ticket.classification_method = classification_result.get("classification_method")
-            ticket.classification_confidence = classification_result.get("confidence")
-            ticket.save()
-            return True
-        return False
-    except Ticket.DoesNotExist:
-        logger.warning(f"Ticket {ticket_id} não encontrado ao atualizar categoria")
-        return False
+        ).values_list('id', flat=True).first()
+        
+        if suggested_category_id is None:
+            return False
+        
+        # UPDATE direto: não carrega o ticket (raw_payload/content_html) só para regravá-lo.
+        updated = update_with_timestamp(
+            Ticket.objects.filter(id=ticket_id),
+            category_id=suggested_category_id,
+            category_name=classification_result.get("suggested_category_name"),
+            classification_method=classification_result.get("classification_method"),
+            classification_confidence=classification_result.get("confidence")
+        )
+        if not updated:
+            logger.warning("Ticket %s não encontrado ao atualizar categoria", ticket_id)
+            return False
+        return True
     except Exception as e:
-        logger.error(f"Erro ao atualizar ticket {ticket_id}: {str(e)}")
+        logger.error("Erro ao atualizar ticket %s: %s", ticket_id, e)
         return False
 
 
@@ -800,19 +882,20 @@ def handle_classification_failure(ticket_id: int) -> Tuple[bool, bool]:
     try:
         ticket = Ticket.objects.get(id=ticket_id)
         ticket.glpi_status = "Aprovação"
-        ticket.save()
+        ticket.save(update_fields=['glpi_status', 'updated_at'])
         
-        suggestion = CategorySuggestion.objects.filter(
-            ticket=ticket,
+        # Só interessa saber se existe: EXISTS evita ordenar e carregar a linha
+        suggestion_exists = CategorySuggestion.objects.filter(
+            ticket_id=ticket_id,
             status='pending'
-        ).order_by('-created_at').first()
+        ).exists()
         
-        return True, suggestion is not None
+        return True, suggestion_exists
     except Ticket.DoesNotExist:
-        logger.warning(f"Ticket {ticket_id} não encontrado ao definir status")
+        logger.warning("Ticket %s não encontrado ao definir status", ticket_id)
         return False, False
     except Exception as e:
-        logger.error(f"Erro ao processar ticket {ticket_id}: {str(e)}")
+        logger.error("Erro ao processar ticket %s: %s", ticket_id, e)
         return False, False
 
 
@@ -863,8 +946,6 @@ def process_suggestion_review(
             - success: True se processado com sucesso
             - error_message: Mensagem de erro ou None
     """
-    from .clients.n8n_client import N8nClient
-    
     category_name, parent_path, error_message = parse_suggestion_path(suggestion.suggested_path)
     if error_message:
         return False, error_message
@@ -925,8 +1006,6 @@ def process_webhook_ticket(validated_data: Dict[str, Any], raw_payload: Dict[str
     Returns:
         Ticket: Instância do ticket criada ou atualizada
     """
-    from .utils import clean_html_content
-    
     cleaned_content = clean_html_content(validated_data["content"])
     
     ticket, _ = Ticket.objects.update_or_create(
@@ -965,7 +1044,10 @@ def _validate_survey_token(survey: Optional[SatisfactionSurvey], provided_token:
     if not survey or not survey.token:
         return True
     
-    if not provided_token or not survey.is_token_valid(provided_token):
+    if not provided_token or not _SURVEY_TOKEN_RE.match(provided_token):
+        return False
+    
+    if not survey.is_token_valid(provided_token):
         return False
     
     return True
@@ -994,8 +1076,6 @@ def process_survey_rating(
             - survey: Instância do survey criado/atualizado
             - error_message: Mensagem de erro ou None se sucesso
     """
-    from .clients.n8n_client import N8nClient
-    
     existing_survey = SatisfactionSurvey.objects.filter(ticket=ticket).first()
     
     if existing_survey:
@@ -1052,8 +1132,6 @@ def process_survey_comment(
             - survey: Instância do survey criado/atualizado
             - error_message: Mensagem de erro ou None se sucesso
     """
-    from .clients.n8n_client import N8nClient
-    
     survey = SatisfactionSurvey.objects.filter(ticket=ticket).first()
     
     if not _validate_survey_token(survey, provided_token):
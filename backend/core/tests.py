@@ -1,3 +1,190 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.contrib import admin
+from django.test import RequestFactory, SimpleTestCase, TestCase
+
+from .admin import TicketAdmin, CategorySuggestionAdmin
+from .clients.glpi_client import GlpiLegacyClient
+from .models import GlpiCategory, Ticket, CategorySuggestion
+from .utils import clean_html_content
+
+
+# =========================================================
+# MODELS
+# =========================================================
+
+class GlpiCategoryEffectiveLevel1Tests(TestCase):
+    """
+    effective_level1 acompanha o caminho em qualquer save().
+    """
+
+    def test_effective_level1_follows_full_path_edits(self):
+        category = GlpiCategory.objects.create(glpi_id=10, name='WiFi', full_path='TI > Redes > WiFi')
+        self.assertEqual(category.effective_level1, 'Redes')
+
+        category.full_path = 'TI > Infraestrutura > WiFi'
+        category.save(update_fields=['full_path'])
+
+        category.refresh_from_db()
+        self.assertEqual(category.effective_level1, 'Infraestrutura')
+
+    def test_effective_level1_is_kept_in_sync_by_update_or_create(self):
+        GlpiCategory.objects.create(glpi_id=11, name='AD', full_path='TI > Acesso > AD')
+
+        GlpiCategory.objects.update_or_create(glpi_id=11, defaults={'full_path': 'TI > Sistemas > AD'})
+
+        self.assertEqual(GlpiCategory.objects.get(glpi_id=11).effective_level1, 'Sistemas')
+
+
+# =========================================================
+# ADMIN
+# =========================================================
+
+class CleanedContentDisplayTests(SimpleTestCase):
+    """
+    Exibição no admin do conteúdo de tickets já limpo por clean_html_content.
+    """
+
+    BODY_HTML = '<p>Impressora&nbsp;da sala P&amp;D</p><p>n&atilde;o liga</p>'
+
+    def test_content_text_clean_decodes_entities_once(self):
+        ticket = Ticket(id=1, name='Teste', content_html=clean_html_content(self.BODY_HTML))
+
+        rendered = TicketAdmin.content_text_clean(None, ticket)
+
+        self.assertIn('Impressora\xa0da sala P&amp;D<br>', rendered)
+        self.assertIn('não liga', rendered)
+        self.assertNotIn('&amp;nbsp;', rendered)
+        self.assertNotIn('&amp;amp;', rendered)
+
+    def test_ticket_content_display_escapes_decoded_markup(self):
+        suggestion = CategorySuggestion(
+            suggested_path='TI > Teste',
+            ticket_content=clean_html_content('<p>&lt;script&gt;alert(1)&lt;/script&gt;</p>')
+        )
+
+        rendered = CategorySuggestionAdmin.ticket_content_display(None, suggestion)
+
+        self.assertEqual(rendered, '&lt;script&gt;alert(1)&lt;/script&gt;')
+
+
+class TicketAdminSearchTests(TestCase):
+    """
+    Busca do admin de tickets: ID exato apenas para termos numéricos ASCII.
+    """
+
+    def setUp(self):
+        self.model_admin = TicketAdmin(Ticket, admin.site)
+        self.request = RequestFactory().get('/admin/core/ticket/')
+        self.ticket = Ticket.objects.create(id=4242, name='Sem relação')
+
+    def _search(self, term):
+        results, _ = self.model_admin.get_search_results(self.request, Ticket.objects.all(), term)
+        return list(results)
+
+    def test_numeric_term_matches_ticket_id(self):
+        self.assertEqual(self._search('4242'), [self.ticket])
+
+    def test_unicode_digit_term_does_not_fail(self):
+        self.assertEqual(self._search('²'), [])
+
+
+# =========================================================
+# CLIENTS
+# =========================================================
+
+def _glpi_response(status_code=200, payload=None):
+    """
+    Monta uma resposta falsa da API do GLPI.
+    
+    Args:
+        status_code: Status HTTP
+        payload: Corpo retornado por json()
+        
+    Returns:
+        mock.Mock: Resposta com status_code, json(), headers e raise_for_status()
+    """
+    response = mock.Mock(status_code=status_code, headers={})
+    response.json.return_value = payload
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.HTTPError(response=response)
+    else:
+        response.raise_for_status.return_value = None
+    return response
+
+
+class GlpiLegacyClientSessionTokenTests(SimpleTestCase):
+    """
+    Cache do session token e nova autenticação após 401 em fetch_categories.
+    """
+
+    CATEGORY = {'id': 1, 'completename': 'TI > Requisição'}
+
+    def setUp(self):
+        GlpiLegacyClient._session_token_cache.clear()
+        self.http = mock.Mock()
+        patcher = mock.patch('core.clients.glpi_client.get_http_session', return_value=self.http)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(GlpiLegacyClient._session_token_cache.clear)
+
+    def _client(self):
+        return GlpiLegacyClient(base_url='http://glpi.test/apirest.php', user='bot', password='secret')
+
+    def _init_session_calls(self):
+        return [c for c in self.http.post.call_args_list if c.args[0].endswith('/initSession')]
+
+    def test_session_token_is_reused_between_clients(self):
+        self.http.post.return_value = _glpi_response(payload={'session_token': 'tok-1'})
+        self.http.get.return_value = _glpi_response(payload=[self.CATEGORY])
+
+        self._client().fetch_categories()
+        self._client().fetch_categories()
+
+        self.assertEqual(len(self._init_session_calls()), 1)
+        for call in self.http.get.call_args_list:
+            self.assertEqual(call.kwargs['headers']['Session-Token'], 'tok-1')
+
+    def test_expired_session_token_triggers_new_init_session(self):
+        key = ('http://glpi.test/apirest.php', 'bot')
+        GlpiLegacyClient._session_token_cache[key] = ('velho', time.monotonic() - 1)
+        self.http.post.return_value = _glpi_response(payload={'session_token': 'tok-2'})
+        self.http.get.return_value = _glpi_response(payload=[self.CATEGORY])
+
+        self._client().fetch_categories()
+
+        self.assertEqual(len(self._init_session_calls()), 1)
+        self.assertEqual(self.http.get.call_args.kwargs['headers']['Session-Token'], 'tok-2')
+
+    def test_401_reauthenticates_once_and_retries_same_page(self):
+        self.http.post.side_effect = [
+            _glpi_response(payload={'session_token': 'tok-1'}),
+            _glpi_response(payload={'session_token': 'tok-2'}),
+        ]
+        self.http.get.side_effect = [
+            _glpi_response(status_code=401),
+            _glpi_response(payload=[self.CATEGORY]),
+        ]
+
+        categories = self._client().fetch_categories()
+
+        self.assertEqual(len(self._init_session_calls()), 2)
+        first_page, retried_page = self.http.get.call_args_list
+        self.assertEqual(first_page.args[0], retried_page.args[0])
+        self.assertEqual(retried_page.kwargs['headers']['Session-Token'], 'tok-2')
+        self.assertEqual([c['glpi_id'] for c in categories], [1])
+
+    def test_second_401_is_raised_without_another_retry(self):
+        self.http.post.side_effect = [
+            _glpi_response(payload={'session_token': 'tok-1'}),
+            _glpi_response(payload={'session_token': 'tok-2'}),
+        ]
+        self.http.get.return_value = _glpi_response(status_code=401)
+
+        with self.assertRaises(requests.HTTPError):
+            self._client().fetch_categories()
+
+        self.assertEqual(len(self._init_session_calls()), 2)
+        self.assertEqual(self.http.get.call_count, 2)
@@ -1,13 +1,24 @@
 """
 Utilitários para processamento de conteúdo HTML e Markdown.
 
-Este módulo contém funções auxiliares para limpeza e formatação de conteúdo.
+Este módulo contém funções auxiliares para limpeza e formatação de conteúdo
+e para atualizações em lote de modelos.
 """
 import re
+import uuid
 import markdown
+from django.utils import timezone
 from django.utils.html import strip_tags
 
 
+# Padrões compilados uma única vez no carregamento do módulo
+_IMG_TAG_RE = re.compile(r'<img[^>]*>')
+_BLOCK_BREAK_RE = re.compile(r'<br(?: ?/)?>|</div>|</p>')
+_BLANK_LINES_RE = re.compile(r'\n\s*\n')
+_HIGHLIGHT_RE = re.compile(r'==([^=]+)==')
+_PRINT_INSTRUCTION_RE = re.compile(r'\[Inserir print da tela ([^\]]+)\]')
+
+
 def clean_html_content(html_content):
     """
     Limpa HTML, remove imagens (assinaturas) e retorna apenas o texto puro.
@@ -28,17 +39,16 @@ def clean_html_content(html_content):
     text = html_content
     
     # Remove imagens (assinaturas de email, etc)
-    text = re.sub(r'<img[^>]*>', '', text)
+    text = _IMG_TAG_RE.sub('', text)
     
     # Converte tags de bloco em quebras de linha
-    text = text.replace('<br>', '\n').replace('<br/>', '\n').replace('<br />', '\n')
-    text = text.replace('</div>', '\n').replace('</p>', '\n')
+    text = _BLOCK_BREAK_RE.sub('\n', text)
     
     # Remove todas as tags HTML restantes
     text = strip_tags(text)
     
     # Remove espaços extras e quebras de linha duplicadas
-    text = re.sub(r'\n\s*\n', '\n\n', text)
+    text = _BLANK_LINES_RE.sub('\n\n', text)
     text = text.strip()
     
     return text
@@ -64,7 +74,6 @@ def markdown_to_html(markdown_content: str) -> str:
     
     # Usa placeholders temporários únicos que não são interpretados pelo Markdown
     # Usa caracteres especiais que não são processados pelo markdown
-    import uuid
     placeholders = {}
     
     # Protege ==texto== (highlight) antes da conversão Markdown
@@ -80,8 +89,8 @@ def markdown_to_html(markdown_content: str) -> str:
         return placeholder
     
     # Substitui extensões customizadas por placeholders
-    protected_content = re.sub(r'==([^=]+)==', highlight_replacer, markdown_content)
-    protected_content = re.sub(r'\[Inserir print da tela ([^\]]+)\]', print_replacer, protected_content)
+    protected_content = _HIGHLIGHT_RE.sub(highlight_replacer, markdown_content)
+    protected_content = _PRINT_INSTRUCTION_RE.sub(print_replacer, protected_content)
     
     # Converte Markdown padrão para HTML
     md = markdown.Markdown(extensions=['extra', 'nl2br'])
@@ -94,3 +103,19 @@ def markdown_to_html(markdown_content: str) -> str:
     
     return html
 
+
+def update_with_timestamp(queryset, **fields) -> int:
+    """
+    Atualiza os registros do queryset em um único UPDATE, renovando updated_at.
+    
+    QuerySet.update() não passa por save() e por isso ignora auto_now;
+    updated_at é preenchido aqui para manter o mesmo efeito de um save().
+    
+    Args:
+        queryset: QuerySet de um modelo com campo updated_at
+        **fields: Campos e valores a atualizar
+        
+    Returns:
+        int: Quantidade de registros atualizados
+    """
+    return queryset.update(updated_at=timezone.now(), **fields)
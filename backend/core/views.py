@@ -12,6 +12,8 @@ from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.throttling import ScopedRateThrottle
+from django.db import transaction
 from django.utils import timezone
 from django.shortcuts import render
 import logging
@@ -46,7 +48,8 @@ from .services import (
     process_categories_sync,
     process_webhook_ticket,
     process_survey_rating,
-    process_survey_comment
+    process_survey_comment,
+    _validate_survey_token
 )
 from .clients.glpi_client import GlpiLegacyClient
 
@@ -84,12 +87,14 @@ def _get_suggestion_or_404(pk: int) -> Tuple[Optional[CategorySuggestion], Optio
         )
 
 
-def _validate_and_get_suggestion(pk: int) -> Tuple[Optional[CategorySuggestion], Optional[Response]]:
+def _validate_and_get_suggestion(pk: int, for_update: bool = False) -> Tuple[Optional[CategorySuggestion], Optional[Response]]:
     """
     Valida e retorna uma sugestão de categoria pendente.
     
     Args:
         pk: ID da sugestão
+        for_update: Se True, bloqueia a linha (SELECT ... FOR UPDATE SKIP LOCKED).
+            Deve ser chamado dentro de transaction.atomic().
         
     Returns:
         Tuple[Optional[CategorySuggestion], Optional[Response]]:
@@ -97,9 +102,23 @@ def _validate_and_get_suggestion(pk: int) -> Tuple[Optional[CategorySuggestion],
             - suggestion: Instância de CategorySuggestion ou None
             - error_response: Response com erro ou None
     """
-    suggestion, error_response = _get_suggestion_or_404(pk)
-    if error_response:
-        return None, error_response
+    if for_update:
+        suggestion = CategorySuggestion.objects.select_for_update(skip_locked=True).filter(pk=pk).first()
+        if suggestion is None:
+            # Linha existe mas está bloqueada: outra revisão da mesma sugestão em andamento
+            if CategorySuggestion.objects.filter(pk=pk).exists():
+                return None, Response(
+                    {"detail": "Sugestão já está sendo revisada"},
+                    status=status.HTTP_409_CONFLICT
+                )
+            return None, Response(
+                {"detail": "Sugestão não encontrada"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+    else:
+        suggestion, error_response = _get_suggestion_or_404(pk)
+        if error_response:
+            return None, error_response
     
     if suggestion.status != 'pending':
         return None, Response(
@@ -120,20 +139,22 @@ def _validate_survey_ticket(ticket_id_str):
         ticket_id_str: ID do ticket como string
         
     Returns:
-        tuple: (ticket, error_context)
+        tuple: (ticket, error_context, error_status)
                ticket: Instância de Ticket ou None
                error_context: Dict com erro para render ou None
+               error_status: Status HTTP do erro (400 ou 404) ou None
     """
     try:
         ticket_id = int(ticket_id_str)
     except (ValueError, TypeError):
-        return None, {'error': 'ID do ticket inválido.'}
+        return None, {'error': 'ID do ticket inválido.'}, status.HTTP_400_BAD_REQUEST
     
     try:
-        ticket = Ticket.objects.get(id=ticket_id)
-        return ticket, None
+        # As páginas da pesquisa só usam id e título; evita trazer raw_payload/content_html
+        ticket = Ticket.objects.only('id', 'name').get(id=ticket_id)
+        return ticket, None, None
     except Ticket.DoesNotExist:
-        return None, {'error': f'Ticket #{ticket_id} não encontrado.'}
+        return None, {'error': f'Ticket #{ticket_id} não encontrado.'}, status.HTTP_404_NOT_FOUND
 
 
 
@@ -204,7 +225,7 @@ class GlpiCategorySyncFromApiView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         except Exception as e:
-            logger.error(f"Erro ao buscar categorias da API GLPI: {str(e)}")
+            logger.error("Erro ao buscar categorias da API GLPI: %s", e)
             return Response(
                 {"detail": f"Erro ao conectar com a API do GLPI: {str(e)}"},
                 status=status.HTTP_503_SERVICE_UNAVAILABLE
@@ -429,24 +450,27 @@ class CategorySuggestionApproveView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request, pk):
-        suggestion, error_response = _validate_and_get_suggestion(pk)
-        if error_response:
-            return error_response
-        
-        serializer = CategorySuggestionReviewSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        
-        reviewed_at = timezone.now()
-        reviewed_by = request.user.username if request.user.is_authenticated else 'api'
-        notes = (serializer.validated_data.get('notes') or '').strip()
-        
-        success, error_message = process_suggestion_review(
-            suggestion=suggestion,
-            new_status='approved',
-            notes=notes,
-            reviewed_by=reviewed_by,
-            reviewed_at=reviewed_at
-        )
+        # Bloqueia a sugestão durante a revisão: cliques duplicados recebem 409
+        # em vez de notificar o n8n duas vezes
+        with transaction.atomic():
+            suggestion, error_response = _validate_and_get_suggestion(pk, for_update=True)
+            if error_response:
+                return error_response
+            
+            serializer = CategorySuggestionReviewSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            
+            reviewed_at = timezone.now()
+            reviewed_by = request.user.username if request.user.is_authenticated else 'api'
+            notes = (serializer.validated_data.get('notes') or '').strip()
+            
+            success, error_message = process_suggestion_review(
+                suggestion=suggestion,
+                new_status='approved',
+                notes=notes,
+                reviewed_by=reviewed_by,
+                reviewed_at=reviewed_at
+            )
         
         if not success:
             return Response(
@@ -486,24 +510,27 @@ class CategorySuggestionRejectView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request, pk):
-        suggestion, error_response = _validate_and_get_suggestion(pk)
-        if error_response:
-            return error_response
-        
-        serializer = CategorySuggestionReviewSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        
-        reviewed_at = timezone.now()
-        reviewed_by = request.user.username if request.user.is_authenticated else 'api'
-        notes = (serializer.validated_data.get('notes') or '').strip()
-        
-        success, error_message = process_suggestion_review(
-            suggestion=suggestion,
-            new_status='rejected',
-            notes=notes,
-            reviewed_by=reviewed_by,
-            reviewed_at=reviewed_at
-        )
+        # Bloqueia a sugestão durante a revisão: cliques duplicados recebem 409
+        # em vez de notificar o n8n duas vezes
+        with transaction.atomic():
+            suggestion, error_response = _validate_and_get_suggestion(pk, for_update=True)
+            if error_response:
+                return error_response
+            
+            serializer = CategorySuggestionReviewSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            
+            reviewed_at = timezone.now()
+            reviewed_by = request.user.username if request.user.is_authenticated else 'api'
+            notes = (serializer.validated_data.get('notes') or '').strip()
+            
+            success, error_message = process_suggestion_review(
+                suggestion=suggestion,
+                new_status='rejected',
+                notes=notes,
+                reviewed_by=reviewed_by,
+                reviewed_at=reviewed_at
+            )
         
         if not success:
             return Response(
@@ -717,29 +744,25 @@ class SatisfactionSurveyRateView(APIView):
     Retorna página de sucesso ou redireciona para página de comentário.
     """
     permission_classes = []
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'satisfaction_survey'
     
     def get(self, request, ticket_id, rating):
-        """Processa avaliação direta e salva."""
-        try:
-            rating = int(rating)
-        except (ValueError, TypeError):
-            return render(request, 'satisfaction_survey/success.html', {
-                'error': 'Rating inválido.',
-                'rating': None
-            }, status=status.HTTP_400_BAD_REQUEST)
+        """
+        Processa avaliação direta e salva.
         
-        if rating < 1 or rating > 5:
-            return render(request, 'satisfaction_survey/success.html', {
-                'error': 'Rating deve ser entre 1 e 5.',
-                'rating': None
-            }, status=status.HTTP_400_BAD_REQUEST)
+        A rota (re_path) só aceita notas de 1 a 5; qualquer outro valor
+        recebe 404 do resolver. As capturas chegam como str.
+        """
+        ticket_id = int(ticket_id)
+        rating = int(rating)
         
-        ticket, error_context = _validate_survey_ticket(ticket_id)
+        ticket, error_context, error_status = _validate_survey_ticket(ticket_id)
         if error_context:
             return render(request, 'satisfaction_survey/success.html', {
                 **error_context,
                 'rating': None
-            }, status=status.HTTP_404_NOT_FOUND if 'não encontrado' in error_context.get('error', '') else status.HTTP_400_BAD_REQUEST)
+            }, status=error_status)
         
         provided_token = request.GET.get('token', '').strip()
         comment = request.GET.get('comment', '').strip()
@@ -774,18 +797,18 @@ class SatisfactionSurveyCommentView(APIView):
     Endpoint: POST /satisfaction-survey/<ticket_id>/comment/ - Salva comentário
     """
     permission_classes = []
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'satisfaction_survey'
     
     def get(self, request, ticket_id):
         """Renderiza formulário para adicionar comentário."""
-        ticket, error_context = _validate_survey_ticket(ticket_id)
+        ticket, error_context, error_status = _validate_survey_ticket(ticket_id)
         if error_context:
-            return render(request, 'satisfaction_survey/comment.html', error_context,
-                        status=status.HTTP_404_NOT_FOUND if 'não encontrado' in error_context.get('error', '') else status.HTTP_400_BAD_REQUEST)
+            return render(request, 'satisfaction_survey/comment.html', error_context, status=error_status)
         
         survey = SatisfactionSurvey.objects.filter(ticket=ticket).first()
         provided_token = request.GET.get('token', '').strip()
         
-        from .services import _validate_survey_token
         if not _validate_survey_token(survey, provided_token):
             return render(request, 'satisfaction_survey/comment.html', {
                 'error': 'Token inválido ou expirado. Esta pesquisa já foi respondida.',
@@ -803,10 +826,9 @@ class SatisfactionSurveyCommentView(APIView):
     
     def post(self, request, ticket_id):
         """Salva comentário na pesquisa."""
-        ticket, error_context = _validate_survey_ticket(ticket_id)
+        ticket, error_context, error_status = _validate_survey_ticket(ticket_id)
         if error_context:
-            return render(request, 'satisfaction_survey/comment.html', error_context,
-                        status=status.HTTP_404_NOT_FOUND if 'não encontrado' in error_context.get('error', '') else status.HTTP_400_BAD_REQUEST)
+            return render(request, 'satisfaction_survey/comment.html', error_context, status=error_status)
         
         comment = request.POST.get('comment', '').strip()
         provided_token = request.POST.get('token', request.GET.get('token', '')).strip()
@@ -877,7 +899,7 @@ class KnowledgeBaseArticleView(APIView):
         category = serializer.validated_data['category']
         context = serializer.validated_data['context']
         
-        logger.info(f"Geração de artigo de Base de Conhecimento solicitada. Tipo: {article_type}, Categoria: {category}")
+        logger.info("Geração de artigo de Base de Conhecimento solicitada. Tipo: %s, Categoria: %s", article_type, category)
         
         result = generate_knowledge_base_article(
             article_type=article_type,